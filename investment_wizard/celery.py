@@ -1,6 +1,9 @@
 import os
+import random
+from datetime import timedelta
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_init
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'investment_wizard.settings')
@@ -14,12 +17,56 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+
+@worker_init.connect
+def check_gevent_patched(sender, **kwargs):
+    """Refuse to start a gevent pool when the standard library wasn't monkey-patched.
+
+    Celery only patches when the pool is chosen with --pool=gevent on the command
+    line; choosing it via settings alone leaves every socket call blocking.
+    """
+    if 'gevent' not in str(sender.pool_cls):
+        return
+    from gevent import monkey
+    if not monkey.is_module_patched('socket'):
+        raise RuntimeError('gevent pool selected without monkey-patching; start the worker with --pool=gevent')
+
+
+@worker_init.connect
+def disable_persistent_db_connections(sender, **kwargs):
+    """Close DB connections after each task on the gevent pool.
+
+    Django connections are greenlet-local there and every task runs in a fresh
+    greenlet, so a connection kept open by CONN_MAX_AGE is never reused.
+    """
+    if 'gevent' not in str(sender.pool_cls):
+        return
+    from django.db import connections
+    for database in connections.settings.values():
+        database['CONN_MAX_AGE'] = 0
+
+
+class JitteredCrontab(crontab):
+    """Crontab that fires a random 0-max_jitter seconds after each scheduled time.
+
+    The offset is drawn once per beat process, so separate deployments spread
+    out instead of all hitting the sources at exactly :00, :05, :10...
+    """
+
+    def __init__(self, *args, max_jitter=30, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.jitter = timedelta(seconds=random.randint(0, max_jitter))
+
+    def remaining_estimate(self, last_run_at):
+        return super().remaining_estimate(last_run_at) + self.jitter
+
+
 # Celery Beat Schedule (5-minute scraping frequency)
 # Configured here to avoid circular import issues
 app.conf.beat_schedule = {
     'scrape-every-5-minutes': {
         'task': 'src.tasks.scrape_articles_task',
-        'schedule': crontab(minute='*/5'),  # Every 5 minutes
+        'schedule': JitteredCrontab(minute='*/5'),  # Every 5 minutes (+0-30s)
     },
     'cleanup-daily': {
         'task': 'src.tasks.cleanup_old_articles_task',
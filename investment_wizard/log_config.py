@@ -0,0 +1,50 @@
+import atexit
+import logging
+import logging.config
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+def configure_logging(logging_settings):
+    """Apply LOGGING, then move the real handlers behind a background queue listener.
+
+    Request and task threads only enqueue records; file and console writes
+    happen on the listener thread. Threads don't survive fork(), so forked
+    children (e.g. Celery prefork workers) start their own queue and listener.
+    """
+    logging.config.dictConfig(logging_settings)
+
+    loggers = [logging.getLogger()] + [
+        logging.getLogger(name) for name in logging_settings.get('loggers', {})
+    ]
+    handlers = []
+    for logger in loggers:
+        for handler in logger.handlers:
+            if handler not in handlers:
+                handlers.append(handler)
+
+    if not handlers:
+        return
+
+    queue_handler = QueueHandler(queue.Queue(-1))
+    for logger in loggers:
+        if logger.handlers:
+            logger.handlers = [queue_handler]
+
+    listener = None
+
+    def start_listener():
+        nonlocal listener
+        # A fresh queue in each process: the inherited one may hold the parent's
+        # records or a lock taken by the parent's listener thread
+        queue_handler.queue = queue.Queue(-1)
+        listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        listener.start()
+
+    def stop_listener():
+        listener.stop()
+
+    start_listener()
+    atexit.register(stop_listener)
+    os.register_at_fork(after_in_child=start_listener)
@@ -5,35 +5,12 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-# Custom console handler for UTF-8 support
+# Make console output UTF-8 safe once (log messages contain emoji) instead of
+# re-encoding every record in the handler
 import sys
-import logging
-
-class UTF8StreamHandler(logging.StreamHandler):
-    def __init__(self, stream=None):
-        super().__init__(stream)
-        if stream is None:
-            stream = sys.stdout
-        self.stream = stream
-    
-    def emit(self, record):
-        try:
-            msg = self.format(record)
-            # Ensure UTF-8 encoding for Windows
-            if sys.platform.startswith('win'):
-                try:
-                    # Try to encode as UTF-8 and handle any encoding errors
-                    encoded_msg = msg.encode('utf-8', errors='replace').decode('utf-8')
-                    self.stream.write(encoded_msg + '\n')
-                except UnicodeError:
-                    # Fallback to ASCII if UTF-8 fails
-                    safe_msg = msg.encode('ascii', errors='replace').decode('ascii')
-                    self.stream.write(safe_msg + '\n')
-            else:
-                self.stream.write(msg + '\n')
-            self.stream.flush()
-        except Exception:
-            self.handleError(record)
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -44,7 +21,7 @@ SECRET_KEY = os.getenv('SECRET_KEY', 'django-insecure-change-this-in-production'
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
 
-ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
+ALLOWED_HOSTS = [host.strip() for host in os.getenv('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',') if host.strip()]
 
 # Application definition
 INSTALLED_APPS = [
@@ -99,8 +76,14 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('DB_PORT', '3306'),
+        # Keep connections open between requests instead of reconnecting each time.
+        # Only threads that outlive a request/task reuse them: gevent workers get
+        # a new greenlet (and connection) per task, so celery.py turns this off there
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
         'OPTIONS': {
             'charset': 'utf8mb4',
+            'init_command': 'SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED',
         },
     }
 }
@@ -135,15 +118,12 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Cache Configuration
+# Redis is already running as the Celery broker; DB 1 keeps cache keys apart from it
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
-        'LOCATION': 'django_cache_table',
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_CACHE_URL', 'redis://localhost:6379/1'),
         'TIMEOUT': 86400,  # 24 hours in seconds
-        'OPTIONS': {
-            'MAX_ENTRIES': 1000,
-            'CULL_FREQUENCY': 3,
-        }
     }
 }
 
@@ -178,23 +158,59 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
 # Worker Configuration
-CELERY_WORKER_POOL = 'threads'
+# Scraping, LLM calls and email are all network-bound, so production workers
+# run the gevent pool. Select it with --pool=gevent on the command line only:
+# that is what makes Celery monkey-patch before importing the project, and a
+# worker configured for gevent without it refuses to start (see celery.py).
+# The defaults below are for workers started without those flags
+CELERY_WORKER_POOL = os.getenv('CELERY_WORKER_POOL', 'threads')
 CELERY_WORKER_CONCURRENCY = int(os.getenv('CELERY_WORKER_CONCURRENCY', '4'))
 CELERY_TASK_ALWAYS_EAGER = False
 
+# Scrape and LLM tasks are long-ish, so don't let one worker hoard a backlog of
+# them; ack after completion so a crashed worker's tasks get redelivered
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_ACKS_LATE = True
+
+# Network-bound email alerts run on their own queue and worker
+CELERY_TASK_ROUTES = {
+    'src.tasks.send_high_confidence_alerts_task': {'queue': 'email'},
+}
+
 # Fix deprecation warnings
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
 
+# Redis connection pooling: share and keep alive broker/result connections
+# instead of opening one per publish. Sized for the 32-greenlet gevent workers
+# even when the flag-less default concurrency is lower
+CELERY_BROKER_POOL_LIMIT = 10
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'max_connections': max(32, CELERY_WORKER_CONCURRENCY) + 8,
+    'socket_keepalive': True,
+    'retry_on_timeout': True,
+    'health_check_interval': 30,
+}
+# The Redis result backend (which the alert chord depends on) ignores transport
+# options for these and reads its own redis_* settings instead
+CELERY_REDIS_MAX_CONNECTIONS = CELERY_BROKER_TRANSPORT_OPTIONS['max_connections']
+CELERY_REDIS_SOCKET_KEEPALIVE = True
+CELERY_REDIS_RETRY_ON_TIMEOUT = True
+CELERY_REDIS_BACKEND_HEALTH_CHECK_INTERVAL = 30
+
 # SendGrid Configuration for High-Confidence Alerts
 SENDGRID_API_KEY = os.getenv('SENDGRID_API_KEY', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', '')
+# Optional dynamic template; when unset, alert bodies are rendered locally
+SENDGRID_TEMPLATE_ID = os.getenv('SENDGRID_TEMPLATE_ID', '')
 
 # Email notification settings
 EMAIL_NOTIFICATION_ENABLED = os.getenv('EMAIL_NOTIFICATION_ENABLED', 'True').lower() == 'true'
-EMAIL_RECIPIENTS = os.getenv('EMAIL_RECIPIENTS', '').split(',')  # Comma-separated list
+EMAIL_RECIPIENTS = [email.strip() for email in os.getenv('EMAIL_RECIPIENTS', '').split(',') if email.strip()]  # Comma-separated list
 CONFIDENCE_THRESHOLD = float(os.getenv('CONFIDENCE_THRESHOLD', '0.7'))
 
 # Logging
+# Handlers below are fed through a QueueListener thread, see log_config.py
+LOGGING_CONFIG = 'investment_wizard.log_config.configure_logging'
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -222,7 +238,7 @@ LOGGING = {
         },
         'console': {
             'level': 'DEBUG',
-            'class': 'investment_wizard.settings.UTF8StreamHandler',
+            'class': 'logging.StreamHandler',
             'formatter': 'safe',
             'stream': 'ext://sys.stdout',
         },
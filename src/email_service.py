@@ -1,202 +1,325 @@
 import logging
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from django.conf import settings
 from django.template.loader import render_to_string
-from typing import Optional, List
+from django.utils.html import escape
+from typing import Optional, List, Tuple
 from .models import Article
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Email, To, Content
+from sendgrid.helpers.mail import Mail, Email, To, Content, Personalization, Substitution
 
 logger = logging.getLogger('news')
 
+# Several alerts share one request: the bodies are rendered once with these tags
+# in place of the per-article fields, and each personalization substitutes its
+# own values (HTML-escaped for the HTML body)
+TEXT_TAG = '-text_%s-'
+HTML_TAG = '-html_%s-'
+ALERT_FIELDS = (
+    'title', 'source', 'published_at', 'url', 'summary', 'suggestion',
+    'confidence_percentage', 'confidence_color', 'confidence_emoji',
+)
+
+# SendGrid rejects a request if any personalization's substitutions exceed 10,000 bytes
+MAX_SUBSTITUTION_BYTES = 10000
+
+SENDGRID_MAIL_SEND_URL = 'https://api.sendgrid.com/v3/mail/send'
+
+# (minimum confidence %, header color, emoji), checked from highest to lowest
+_CONFIDENCE_STYLES = (
+    (90, '#d32f2f', '🔥'),  # Red for very high confidence
+    (80, '#f57c00', '⚠️'),  # Orange for high confidence
+    (0, '#1976d2', '📈'),  # Blue for medium-high confidence
+)
+
+# Outcomes of one SendGrid request: accepted, failed transiently (429/5xx or a
+# connection error, worth retrying), or rejected for good (other 4xx)
+SEND_OK = 'ok'
+SEND_RETRY = 'retry'
+SEND_REJECTED = 'rejected'
+
+# SendGrid caps a single /mail/send request at 1000 recipients in total
+MAX_RECIPIENTS_PER_REQUEST = 1000
+
+# Upper bound on SendGrid requests in flight at once (matches the session pool size)
+MAX_CONCURRENT_REQUESTS = 16
+
+# Notification settings, read once at import instead of on every instantiation
+_ENABLED = getattr(settings, 'EMAIL_NOTIFICATION_ENABLED', True)
+_RECIPIENTS = getattr(settings, 'EMAIL_RECIPIENTS', [])
+_CONFIDENCE_THRESHOLD = getattr(settings, 'CONFIDENCE_THRESHOLD', 0.7)
+_FROM_EMAIL = getattr(settings, 'DEFAULT_FROM_EMAIL', '')
+_SENDGRID_API_KEY = getattr(settings, 'SENDGRID_API_KEY', '')
+_SENDGRID_TEMPLATE_ID = getattr(settings, 'SENDGRID_TEMPLATE_ID', '')
+
+
+class AlertSendError(Exception):
+    """Raised when some alert requests failed; carries the IDs of the articles still unsent."""
+    
+    def __init__(self, message: str, unsent_ids: List[int], sent_count: int):
+        super().__init__(message)
+        self.unsent_ids = unsent_ids
+        self.sent_count = sent_count
+
 
 class EmailNotificationService:
     """Service for sending email notifications for high-confidence investment suggestions."""
     
     def __init__(self):
-        self.enabled = getattr(settings, 'EMAIL_NOTIFICATION_ENABLED', True)
-        self.recipients = getattr(settings, 'EMAIL_RECIPIENTS', [])
-        self.confidence_threshold = getattr(settings, 'CONFIDENCE_THRESHOLD', 0.7)
-        self.from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', '')
-        self.sendgrid_api_key = getattr(settings, 'SENDGRID_API_KEY', '')
-        self.sg_client = SendGridAPIClient(self.sendgrid_api_key) if self.sendgrid_api_key else None
+        self.enabled = _ENABLED
+        self.recipients = _RECIPIENTS
+        self.confidence_threshold = _CONFIDENCE_THRESHOLD
+        self.threshold_percentage = self.confidence_threshold * 100
+        self.from_email = _FROM_EMAIL
+        self.sendgrid_api_key = _SENDGRID_API_KEY
+        self.template_id = _SENDGRID_TEMPLATE_ID
+        self.session = self._build_session() if self.sendgrid_api_key else None
+        
+        # SendGrid address objects are read-only once built, so share them across sends
+        self._from_email_obj = Email(self.from_email) if self.from_email else None
+        self._to_email_objs = [To(email) for email in self.recipients]
+        self._alert_skeleton = None
 
-        logger.info(f"Email Service Initialized - Enabled: {self.enabled}, Recipients: {len(self.recipients) if self.recipients else 0}, From: {self.from_email or 'NOT SET'}, SendGrid API Key: {'SET' if self.sendgrid_api_key else 'NOT SET'}, Threshold: {self.confidence_threshold}")
+        logger.info(
+            "Email Service Initialized - Enabled: %s, Recipients: %d, From: %s, SendGrid API Key: %s, Threshold: %s",
+            self.enabled, len(self.recipients), self.from_email or 'NOT SET',
+            'SET' if self.sendgrid_api_key else 'NOT SET', self.confidence_threshold
+        )
+        if not self.recipients or not self.from_email:
+            logger.warning("Email notifications disabled: Recipients=%s, From=%s", self.recipients, self.from_email or 'NOT SET')
+    
+    def _build_session(self) -> requests.Session:
+        """Create a pooled HTTP session so successive sends reuse one TLS connection."""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=MAX_CONCURRENT_REQUESTS,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.2,
+                status_forcelist=[429, 502, 503],
+                allowed_methods=frozenset(['POST']),
+            )
+        )
+        session.mount('https://', adapter)
+        session.headers.update({
+            'Authorization': f'Bearer {self.sendgrid_api_key}',
+            'Content-Type': 'application/json',
+        })
+        return session
+    
+    def _send_mail(self, mail: Mail) -> requests.Response:
+        """Post a mail payload to the SendGrid v3 API over the shared session."""
+        return self.session.post(SENDGRID_MAIL_SEND_URL, json=mail.get(), timeout=10)
     
     def should_send_notification(self, confidence_score: Optional[float]) -> bool:
         """Check if notification should be sent based on confidence score."""
-        if not self.enabled:
-            logger.info(f"Email notification skipped: EMAIL_NOTIFICATION_ENABLED is False")
+        # Missing recipients/sender is reported once at startup, not per article
+        if not self.recipients or not self.from_email:
             return False
         
-        if not self.recipients or not self.from_email:
-            logger.warning(f"Email notifications disabled: Recipients={self.recipients}, From={self.from_email or 'NOT SET'}")
+        if not self.enabled:
+            logger.info("Email notification skipped: EMAIL_NOTIFICATION_ENABLED is False")
             return False
         
         if confidence_score is None:
-            logger.info(f"Email notification skipped: confidence_score is None")
+            logger.info("Email notification skipped: confidence_score is None")
             return False
         
         if confidence_score >= self.confidence_threshold:
-            logger.info(f"Email notification WILL be sent: confidence_score ({confidence_score}) >= threshold ({self.confidence_threshold})")
+            logger.info("Email notification WILL be sent: confidence_score (%s) >= threshold (%s)", confidence_score, self.confidence_threshold)
             return True
         else:
-            logger.info(f"Email notification skipped: confidence_score ({confidence_score}) < threshold ({self.confidence_threshold})")
+            logger.info("Email notification skipped: confidence_score (%s) < threshold (%s)", confidence_score, self.confidence_threshold)
             return False
     
     def send_high_confidence_alert(self, article: Article) -> bool:
         """Send email notification for high-confidence investment suggestion."""
-        if not self.should_send_notification(article.confidence_score):
-            return False
-        
         try:
-            subject = f"🚨 High-Confidence Investment Alert: {article.title[:50]}..."
-            
-            # Create email content
-            context = {
-                'article': article,
-                'confidence_score': article.confidence_score,
-                'confidence_percentage': round(article.confidence_score * 100, 1),
-                'threshold': self.confidence_threshold,
-            }
-            
-            # Plain text version
-            message = self._create_plain_text_message(context)
-            
-            # HTML version
-            html_message = self._create_html_message(context)
-            
-            # Send email using SendGrid
-            if not self.sg_client:
-                logger.error('SendGrid client not initialized - missing API key')
-                return False
-            
-            try:
-                # Create SendGrid mail object
-                from_email = Email(self.from_email)
-                to_emails = [To(email) for email in self.recipients]
-                plain_text_content = Content('text/plain', message)
-                html_content = Content('text/html', html_message)
-                
-                mail = Mail(
-                    from_email=from_email,
-                    to_emails=to_emails,
-                    subject=subject,
-                    plain_text_content=plain_text_content,
-                    html_content=html_content
-                )
-                
-                # Send the email
-                response = self.sg_client.send(mail)
-                result = response.status_code in [200, 201, 202]
-            except Exception as sendgrid_error:
-                logger.error(f'SendGrid API error: {str(sendgrid_error)}')
-                return False
-            
-            if result:
-                logger.info(f"High-confidence alert sent for article {article.id} (confidence: {article.confidence_score})")
-                return True
-            else:
-                logger.error(f"Failed to send high-confidence alert for article {article.id}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Error sending high-confidence alert for article {article.id}: {str(e)}")
+            return self.send_high_confidence_alerts_batch([article]) == 1
+        except AlertSendError:
             return False
     
-    def _create_plain_text_message(self, context: dict) -> str:
-        """Create plain text email message."""
-        article = context['article']
-        confidence_percentage = context['confidence_percentage']
-        
-        message = f"""
-🚨 HIGH-CONFIDENCE INVESTMENT ALERT 🚨
-
-Confidence Score: {confidence_percentage}% (Threshold: {self.confidence_threshold * 100}%)
+    def send_high_confidence_alerts_batch(self, articles: List[Article]) -> int:
+        """Send alerts for all qualifying articles using as few SendGrid requests as possible.
 
-Article: {article.title}
-Source: {article.source}
-Published: {article.published_at.strftime('%Y-%m-%d %H:%M UTC')}
-URL: {article.url}
-
-SUMMARY:
-{article.summary or 'No summary available'}
-
-INVESTMENT SUGGESTION:
-{article.suggestion or 'No suggestion available'}
-
----
-This alert was generated by Investment Wizard
-Confidence threshold: {self.confidence_threshold * 100}%
-        """.strip()
+        Each article gets its own personalization, so recipients still receive one
+        email per article. With SENDGRID_TEMPLATE_ID set, SendGrid renders the body
+        from a dynamic template; otherwise the local templates are substituted in.
+        Returns the number of articles an alert was sent for. If any request fails
+        transiently, the others still go out and AlertSendError lists the articles
+        left unsent; requests SendGrid rejects outright are logged and dropped.
+        """
+        qualifying = [article for article in articles if self.should_send_notification(article.confidence_score)]
+        if not qualifying:
+            return 0
         
-        return message
-    
-    def _create_html_message(self, context: dict) -> str:
-        """Create HTML email message."""
-        article = context['article']
-        confidence_percentage = context['confidence_percentage']
+        if not self.session:
+            logger.error('SendGrid client not initialized - missing API key')
+            return 0
         
-        # Color coding based on confidence level
-        if confidence_percentage >= 90:
-            confidence_color = "#d32f2f"  # Red for very high confidence
-            confidence_emoji = "🔥"
-        elif confidence_percentage >= 80:
-            confidence_color = "#f57c00"  # Orange for high confidence
-            confidence_emoji = "⚠️"
+        batch_size = max(1, MAX_RECIPIENTS_PER_REQUEST // len(self.recipients))
+        contexts = {article.id: self._build_context(article) for article in qualifying}
+        # An article too long for the substitution limit would get the whole shared
+        # request rejected, so it goes out alone with its body rendered in full
+        oversized = [] if self.template_id else [
+            article for article in qualifying
+            if self._substitutions_size(contexts[article.id]) > MAX_SUBSTITUTION_BYTES
+        ]
+        oversized_ids = {article.id for article in oversized}
+        shared = [article for article in qualifying if article.id not in oversized_ids]
+        batches = [shared[start:start + batch_size] for start in range(0, len(shared), batch_size)]
+        standalone = [False] * len(batches) + [True] * len(oversized)
+        batches += [[article] for article in oversized]
+        
+        def send(batch, standalone):
+            return self._try_send_alert_batch([contexts[article.id] for article in batch], standalone)
+        
+        if len(batches) == 1:
+            outcomes = [send(batches[0], standalone[0])]
         else:
-            confidence_color = "#1976d2"  # Blue for medium-high confidence
-            confidence_emoji = "📈"
+            # Requests are independent, so post them concurrently over the pooled session
+            with ThreadPoolExecutor(max_workers=min(len(batches), MAX_CONCURRENT_REQUESTS)) as executor:
+                outcomes = list(executor.map(send, batches, standalone))
         
-        html_message = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>High-Confidence Investment Alert</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .header {{ background-color: {confidence_color}; color: white; padding: 20px; text-align: center; }}
-                .content {{ padding: 20px; }}
-                .confidence {{ font-size: 24px; font-weight: bold; color: white; }}
-                .article-title {{ font-size: 18px; font-weight: bold; margin: 15px 0; }}
-                .summary, .suggestion {{ background-color: #f5f5f5; padding: 15px; margin: 10px 0; border-left: 4px solid {confidence_color}; }}
-                .footer {{ background-color: #f0f0f0; padding: 15px; text-align: center; font-size: 12px; color: #666; }}
-                .url {{ word-break: break-all; color: #1976d2; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>{confidence_emoji} HIGH-CONFIDENCE INVESTMENT ALERT {confidence_emoji}</h1>
-                <div class="confidence">Confidence Score: {confidence_percentage}%</div>
-                <p>Threshold: {self.confidence_threshold * 100}%</p>
-            </div>
-            
-            <div class="content">
-                <div class="article-title">{article.title}</div>
-                <p><strong>Source:</strong> {article.source}</p>
-                <p><strong>Published:</strong> {article.published_at.strftime('%Y-%m-%d %H:%M UTC')}</p>
-                <p><strong>URL:</strong> <a href="{article.url}" class="url">{article.url}</a></p>
-                
-                <div class="summary">
-                    <h3>📋 SUMMARY</h3>
-                    <p>{article.summary or 'No summary available'}</p>
-                </div>
-                
-                <div class="suggestion">
-                    <h3>💡 INVESTMENT SUGGESTION</h3>
-                    <p>{article.suggestion or 'No suggestion available'}</p>
-                </div>
-            </div>
-            
-            <div class="footer">
-                <p>This alert was generated by Investment Wizard</p>
-                <p>Confidence threshold: {self.confidence_threshold * 100}%</p>
-            </div>
-        </body>
-        </html>
+        sent_count = sum(len(batch) for batch, outcome in zip(batches, outcomes) if outcome == SEND_OK)
+        # Rejected batches would fail the same way again, so only transient failures are retried
+        unsent_ids = [article.id for batch, outcome in zip(batches, outcomes) if outcome == SEND_RETRY for article in batch]
+        if unsent_ids:
+            raise AlertSendError(
+                f"Alerts for {len(unsent_ids)} of {len(qualifying)} articles could not be sent",
+                unsent_ids, sent_count
+            )
+        return sent_count
+    
+    def _try_send_alert_batch(self, contexts: List[dict], standalone: bool = False) -> str:
+        """Send one batch, logging instead of raising; returns SEND_OK, SEND_RETRY or SEND_REJECTED."""
+        try:
+            self._send_alert_batch(contexts, standalone)
+            return SEND_OK
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.RetryError):
+            logger.exception("SendGrid send failed for %d articles, will retry", len(contexts))
+            return SEND_RETRY
+        except requests.HTTPError as e:
+            status = e.response.status_code
+            if status == 429 or status >= 500:
+                logger.error("SendGrid send failed for %d articles (status %s), will retry", len(contexts), status)
+                return SEND_RETRY
+            logger.error("SendGrid permanently rejected alerts for %d articles (status %s): %s", len(contexts), status, e.response.text[:500])
+            return SEND_REJECTED
+        except Exception:
+            logger.exception("Alert send failed permanently for %d articles", len(contexts))
+            return SEND_REJECTED
+    
+    def _send_alert_batch(self, contexts: List[dict], standalone: bool = False):
+        """Send one SendGrid request covering the given article contexts; raises if it is not accepted.
+
+        A standalone request carries a single article with its body rendered in
+        full instead of substituted into the shared skeleton.
         """
+        if standalone:
+            mail = Mail(
+                from_email=self._from_email_obj,
+                plain_text_content=Content('text/plain', self._create_plain_text_message(contexts[0])),
+                html_content=Content('text/html', self._create_html_message(contexts[0]))
+            )
+        else:
+            mail = self._create_alert_mail()
+        for context in contexts:
+            mail.add_personalization(self._create_personalization(context, substitute=not standalone), index=len(mail.personalizations))
+        
+        response = self._send_mail(mail)
+        if response.status_code not in [200, 201, 202]:
+            raise requests.HTTPError(f"SendGrid rejected the request (status {response.status_code})", response=response)
+        
+        logger.info("High-confidence alerts sent for %d articles", len(contexts))
+    
+    def _create_alert_mail(self) -> Mail:
+        """Create the shared part of an alert request; per-article data goes in personalizations."""
+        if self.template_id:
+            mail = Mail(from_email=self._from_email_obj)
+            mail.template_id = self.template_id
+            return mail
+        
+        text_body, html_body = self._get_alert_skeleton()
+        return Mail(
+            from_email=self._from_email_obj,
+            plain_text_content=Content('text/plain', text_body),
+            html_content=Content('text/html', html_body)
+        )
+    
+    def _get_alert_skeleton(self) -> Tuple[str, str]:
+        """Render the text and HTML bodies once, with substitution tags for the per-article fields."""
+        if self._alert_skeleton is None:
+            context = {'threshold_percentage': self.threshold_percentage}
+            self._alert_skeleton = (
+                self._create_plain_text_message({**context, **{field: TEXT_TAG % field for field in ALERT_FIELDS}}),
+                self._create_html_message({**context, **{field: HTML_TAG % field for field in ALERT_FIELDS}}),
+            )
+        return self._alert_skeleton
+    
+    def _get_substitutions(self, context: dict) -> List[Tuple[str, str]]:
+        """(tag, value) pairs filling one article into the alert skeleton."""
+        substitutions = []
+        for field in ALERT_FIELDS:
+            value = str(context[field])
+            substitutions.append((TEXT_TAG % field, value))
+            substitutions.append((HTML_TAG % field, escape(value)))
+        return substitutions
+    
+    def _substitutions_size(self, context: dict) -> int:
+        """Bytes SendGrid counts against the per-personalization substitution limit."""
+        return sum(len(tag.encode('utf-8')) + len(value.encode('utf-8')) for tag, value in self._get_substitutions(context))
+    
+    def _create_personalization(self, context: dict, substitute: bool = True) -> Personalization:
+        """Create the personalization carrying one article's alert."""
+        personalization = Personalization()
+        for to_email in self._to_email_objs:
+            personalization.add_to(to_email)
+        
+        if self.template_id:
+            personalization.dynamic_template_data = context
+            return personalization
+        
+        personalization.subject = context['subject']
+        if substitute:
+            for tag, value in self._get_substitutions(context):
+                personalization.add_substitution(Substitution(tag, value))
+        
+        return personalization
+    
+    def _build_context(self, article: Article) -> dict:
+        """Build the template context (and dynamic template data) for an article alert."""
+        confidence_percentage = round(article.confidence_score * 100, 1)
+        
+        # Color coding based on confidence level
+        for min_percentage, confidence_color, confidence_emoji in _CONFIDENCE_STYLES:
+            if confidence_percentage >= min_percentage:
+                break
         
-        return html_message
+        return {
+            'subject': f"🚨 High-Confidence Investment Alert: {article.title[:50]}...",
+            'title': article.title,
+            'source': article.source,
+            'published_at': article.published_at.strftime('%Y-%m-%d %H:%M UTC'),
+            'url': article.url,
+            'summary': article.summary or 'No summary available',
+            'suggestion': article.suggestion or 'No suggestion available',
+            'confidence_percentage': confidence_percentage,
+            'confidence_color': confidence_color,
+            'confidence_emoji': confidence_emoji,
+            'threshold_percentage': self.threshold_percentage,
+        }
+    
+    def _create_plain_text_message(self, context: dict) -> str:
+        """Create plain text email message."""
+        return render_to_string('emails/high_confidence_alert.txt', context).strip()
+    
+    def _create_html_message(self, context: dict) -> str:
+        """Create HTML email message."""
+        return render_to_string('emails/high_confidence_alert.html', context)
     
     def test_email_configuration(self) -> bool:
         """Test email configuration by sending a test email."""
@@ -204,31 +327,33 @@ Confidence threshold: {self.confidence_threshold * 100}%
             logger.error("Email configuration incomplete")
             return False
         
+        if not self.session:
+            logger.error('SendGrid client not initialized - missing API key')
+            return False
+        
+        # Create test email using SendGrid
+        plain_text_content = Content('text/plain', 'This is a test email to verify your email configuration is working correctly.')
+        
+        mail = Mail(
+            from_email=self._from_email_obj,
+            to_emails=self._to_email_objs,
+            subject='Investment Wizard - Email Configuration Test',
+            plain_text_content=plain_text_content
+        )
+        
+        # Send the test email
         try:
-            if not self.sg_client:
-                logger.error('SendGrid client not initialized - missing API key')
-                return False
-            
-            # Create test email using SendGrid
-            from_email = Email(self.from_email)
-            to_emails = [To(email) for email in self.recipients]
-            plain_text_content = Content('text/plain', 'This is a test email to verify your email configuration is working correctly.')
-            
-            mail = Mail(
-                from_email=from_email,
-                to_emails=to_emails,
-                subject='Investment Wizard - Email Configuration Test',
-                plain_text_content=plain_text_content
-            )
-            
-            # Send the test email
-            response = self.sg_client.send(mail)
-            result = response.status_code in [200, 201, 202]
-            logger.info("Test email sent successfully")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to send test email: {str(e)}")
+            response = self._send_mail(mail)
+        except Exception:
+            logger.exception("SendGrid send failed for test email")
+            return False
+        
+        if response.status_code not in [200, 201, 202]:
+            logger.error("Test email rejected by SendGrid (status %s)", response.status_code)
             return False
+        
+        logger.info("Test email sent successfully")
+        return True
     
     def get_configuration_status(self) -> dict:
         """Get current email configuration status."""
@@ -241,6 +366,17 @@ Confidence threshold: {self.confidence_threshold * 100}%
         }
 
 
+_service = None
+
+
+def get_service() -> EmailNotificationService:
+    """Return the process-wide EmailNotificationService, creating it on first use."""
+    global _service
+    if _service is None:
+        _service = EmailNotificationService()
+    return _service
+
+
 if __name__ == "__main__":
     # Test email service
     import os
@@ -252,7 +388,7 @@ if __name__ == "__main__":
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'investment_wizard.settings')
     django.setup()
     
-    email_service = EmailNotificationService()
+    email_service = get_service()
     print("Email Configuration Status:")
     print(email_service.get_configuration_status())
     
@@ -3,21 +3,111 @@ import sys
 import django
 import logging
 import hashlib
-import json
+import random
+import asyncio
+import functools
+import collections
+import orjson
 import tiktoken
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Union
 from datetime import datetime, timedelta
+from asgiref.sync import sync_to_async
 from django.core.cache import cache
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 
 logger = logging.getLogger('news')
 
+ESTIMATE_SAMPLE_CHARS = 2048  # characters tokenized per text by estimate_cost
+
+SYSTEM_MESSAGE = 'You are a financial analyst providing investment insights based on news articles.'
+
+# Combined summary + investment suggestion prompt, filled in with str.format
+ARTICLE_PROMPT_TEMPLATE = """
+You are a financial analyst. First summarize the news article below in 2-3 sentences, focusing on the key facts and main points that would be relevant for investment decisions.
+
+Then evaluate the short-term (1–7 days) impact of this news on publicly traded stocks or market indices only. Ignore startups, private firms, or long-term ecosystem effects.
+
+Scoring rules:
+- 0.0–0.1: Absolutely no short-term market impact
+- 0.2: Minimal/negligible impact
+- 0.3–0.4: Very minor impact, not worth investment action
+- 0.5: Neutral / uncertain impact
+- 0.6–0.8: Clear impact on a sector or public company
+- 0.9–1.0: Strong, highly certain impact on overall market or major stocks
+
+Examples:
+- "Fed unexpectedly raises interest rates" → 0.95
+- "Apple launches new color iPhone case" → 0.15
+- "Tesla recalls 2M vehicles due to safety issue" → 0.8
+- "Lebron James's VC firm invests in a private AI food startup" → 0.0
+
+News Content: {content}
+
+Respond ONLY in valid JSON:
+{{
+  "summary": "[2-3 sentence summary]",
+  "key_impact": "[brief impact]",
+  "suggestion": "[investment recommendation]",
+  "confidence_score": <float between 0 and 1>
+}}
+"""
+
+# Structured output formats per task type, so the API always returns parseable JSON
+RESPONSE_FORMATS = {
+    'article_analysis': {
+        'type': 'json_schema',
+        'name': 'article_analysis',
+        'strict': True,
+        'schema': {
+            'type': 'object',
+            'properties': {
+                'summary': {'type': 'string'},
+                'key_impact': {'type': 'string'},
+                'suggestion': {'type': 'string'},
+                'confidence_score': {'type': 'number'},
+            },
+            'required': ['summary', 'key_impact', 'suggestion', 'confidence_score'],
+            'additionalProperties': False,
+        },
+    },
+}
+
+
+@functools.lru_cache(maxsize=8)
+def _get_encoding(model: str) -> tiktoken.Encoding:
+    """Load the tokenizer for a model once per process (building it is expensive)."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception as e:
+        logger.warning(f"Could not initialize tokenizer for {model}: {e}")
+        # Fallback to cl100k_base encoding (used by GPT-4)
+        return _get_fallback_encoding()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_fallback_encoding() -> tiktoken.Encoding:
+    """Load the cl100k_base fallback tokenizer once per process."""
+    return tiktoken.get_encoding("cl100k_base")
+
+
 class LLMService:
     """Service for generating summaries and investment suggestions using LLM."""
     
+    _L1_MAX = 256  # entries kept in the in-process cache in front of Redis
+    _singleton = None
+    
+    @classmethod
+    def instance(cls) -> 'LLMService':
+        """Return the process-wide service, creating it on first use so the client and tokenizer are reused."""
+        if cls._singleton is None:
+            cls._singleton = cls()
+        return cls._singleton
+    
     def __init__(self):
         self.api_key = os.getenv('OPENAI_API_KEY')
         self.cache_timeout = 86400  # 24 hours in seconds
+        self.cache_timeout_jitter = 3600  # +/- 1 hour so entries don't all expire together
+        self._l1 = collections.OrderedDict()
         
         # Initialize OpenAI client
         self.client = OpenAI(api_key=self.api_key) if self.api_key else None
@@ -32,17 +122,17 @@ class LLMService:
             'gpt-4.1': {'input': 2.00, 'cached_input': 0.50, 'output': 8.00},
             'gpt-4o-mini': {'input': 0.40, 'cached_input': 0.10, 'output': 1.60}
         }
+        # Per-token (input, output) prices, pre-divided for _calculate_cost
+        self._price_per_tok = {
+            model: (prices['input'] / 1_000_000, prices['output'] / 1_000_000)
+            for model, prices in self.pricing.items()
+        }
         
         # Default model (can be overridden per call)
         self.default_model = 'gpt-5-mini'
         
         # Initialize tokenizer for token counting
-        try:
-            self.tokenizer = tiktoken.encoding_for_model(self.default_model)
-        except Exception as e:
-            logger.warning(f"Could not initialize tokenizer for {self.default_model}: {e}")
-            # Fallback to cl100k_base encoding (used by GPT-4)
-            self.tokenizer = tiktoken.get_encoding("cl100k_base")
+        self.tokenizer = _get_encoding(self.default_model)
     
     def _count_tokens(self, text: str) -> int:
         """Count tokens in the given text."""
@@ -53,20 +143,29 @@ class LLMService:
             # Fallback: rough estimation (1 token ≈ 4 characters)
             return len(text) // 4
     
+    def _count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """Count tokens for many texts at once (tiktoken encodes the batch in parallel threads)."""
+        try:
+            return [len(tokens) for tokens in self.tokenizer.encode_batch(texts, num_threads=os.cpu_count() or 1)]
+        except Exception as e:
+            logger.warning(f"Error counting tokens: {e}")
+            # Fallback: rough estimation (1 token ≈ 4 characters)
+            return [len(text) // 4 for text in texts]
+    
     def _calculate_cost(self, input_tokens: int, output_tokens: int, model: str = None) -> Dict[str, float]:
         """Calculate the cost of an API call based on token usage."""
         if model is None:
             model = self.default_model
         
-        if model not in self.pricing:
+        prices = self._price_per_tok.get(model)
+        if prices is None:
             logger.warning(f"Unknown model {model}, using gpt-5-mini pricing")
             model = 'gpt-5-mini'
+            prices = self._price_per_tok[model]
         
-        pricing = self.pricing[model]
-        
-        # Convert tokens to millions and calculate cost
-        input_cost = (input_tokens / 1_000_000) * pricing['input']
-        output_cost = (output_tokens / 1_000_000) * pricing['output']
+        input_price, output_price = prices
+        input_cost = input_tokens * input_price
+        output_cost = output_tokens * output_price
         total_cost = input_cost + output_cost
         
         return {
@@ -80,12 +179,16 @@ class LLMService:
     
     def _log_cost(self, cost_info: Dict[str, float], task_type: str) -> None:
         """Log the cost information for an API call."""
+        # %-style arguments so nothing is formatted when INFO is disabled
         logger.info(
-            f"LLM API Cost - {task_type} | "
-            f"Model: {cost_info['model']} | "
-            f"Input: {cost_info['input_tokens']} tokens (${cost_info['input_cost']:.6f}) | "
-            f"Output: {cost_info['output_tokens']} tokens (${cost_info['output_cost']:.6f}) | "
-            f"Total: ${cost_info['total_cost']:.6f}"
+            "LLM API Cost - %s | Model: %s | Input: %d tokens ($%.6f) | Output: %d tokens ($%.6f) | Total: $%.6f",
+            task_type,
+            cost_info['model'],
+            cost_info['input_tokens'],
+            cost_info['input_cost'],
+            cost_info['output_tokens'],
+            cost_info['output_cost'],
+            cost_info['total_cost']
         )
     
     def _truncate_content(self, content: str, max_length: int) -> str:
@@ -93,70 +196,94 @@ class LLMService:
         if len(content) <= max_length:
             return content
         
-        # Find the last complete word within the limit
+        # Split off the last (possibly partial) word within the limit
         truncated = content[:max_length]
-        last_space = truncated.rfind(' ')
+        head, sep, _ = truncated.rpartition(' ')
         
-        if last_space > max_length * 0.8:  # Only truncate at word boundary if we don't lose too much content
-            return truncated[:last_space] + "..."
+        if sep and len(head) > max_length * 0.8:  # Only truncate at word boundary if we don't lose too much content
+            return head + "..."
         else:
             return truncated + "..."
     
-    def _get_cache_key(self, content: str, task_type: str) -> str:
-        """Generate a cache key for the given content and task type."""
-        content_hash = hashlib.md5(content.encode()).hexdigest()
-        return f"llm_{task_type}_{content_hash}"
+    def _get_cache_key(self, *parts: str, task_type: str) -> str:
+        """Generate a cache key for the given content parts and task type."""
+        # BLAKE2b is faster than MD5 here and 8 bytes is plenty for cache keys;
+        # parts are fed one by one instead of hashing a concatenated copy
+        hasher = hashlib.blake2b(digest_size=8)
+        for index, part in enumerate(parts):
+            if index:
+                hasher.update(b'\x1f')
+            hasher.update(part.encode('utf-8', 'ignore'))
+        return f"llm_{task_type}_{hasher.hexdigest()}"
     
     def _get_from_cache(self, cache_key: str) -> Optional[Any]:
-        """Get result from Django cache if it exists."""
+        """Get result from the in-process cache, then Django cache, if it exists."""
+        if cache_key in self._l1:
+            logger.info(f"Local cache hit for {cache_key}")
+            return self._l1[cache_key]
         try:
             result = cache.get(cache_key)
             if result:
                 logger.info(f"Cache hit for {cache_key}")
+                self._save_to_l1(cache_key, result)
             return result
         except Exception as e:
             logger.info(f"Cache get error for {cache_key}: {str(e)}")
             return None
     
     def _save_to_cache(self, cache_key: str, result: Any) -> None:
-        """Save result to Django cache with timeout."""
+        """Save result to the in-process cache and Django cache with timeout."""
+        self._save_to_l1(cache_key, result)
         try:
-            cache.set(cache_key, result, timeout=self.cache_timeout)
+            timeout = self.cache_timeout + random.randint(-self.cache_timeout_jitter, self.cache_timeout_jitter)
+            cache.set(cache_key, result, timeout=timeout)
             logger.info(f"Cached result for {cache_key}")
         except Exception as e:
             logger.info(f"Cache set error for {cache_key}: {str(e)}")
     
+    def _save_to_l1(self, cache_key: str, result: Any) -> None:
+        """Save result to the bounded in-process cache, evicting the oldest entry when full."""
+        self._l1[cache_key] = result
+        if len(self._l1) > self._L1_MAX:
+            self._l1.popitem(last=False)
+    
     def clear_cache(self) -> None:
         """Clear all LLM cache entries."""
-        try:
-            cache.clear()
-            logger.info("LLM cache cleared successfully")
-        except Exception as e:
-            logger.warning(f"Error clearing cache: {str(e)}")
+        self.clear_llm_cache()
     
-    def clear_llm_cache(self) -> None:
-        """Clear only LLM-related cache entries (safer than clearing all cache)."""
+    def clear_llm_cache(self) -> int:
+        """Clear only LLM-related cache entries, leaving other cached data untouched."""
+        self._l1.clear()
         try:
-            # Get all cache keys (this might not work with all cache backends)
-            # For simplicity, we'll clear all cache
+            # Django's Redis backend exposes the underlying redis-py client; scan for our
+            # prefixed keys and UNLINK them so Redis frees the memory asynchronously
+            client = cache._cache.get_client(write=True)
+            deleted = 0
+            batch = []
+            for key in client.scan_iter(match=cache.make_key("llm_*"), count=1000):
+                batch.append(key)
+                if len(batch) >= 1000:
+                    deleted += client.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += client.unlink(*batch)
+            logger.info(f"LLM cache cleared - {deleted} entries removed, old responses will be regenerated")
+            return deleted
+        except AttributeError:
+            # Backends without key enumeration (locmem, database) can only be cleared as a whole
+            logger.warning("Cache backend cannot list keys, clearing the whole cache")
             cache.clear()
-            logger.info("LLM cache cleared - old responses will be regenerated")
+            return 0
         except Exception as e:
-            logger.warning(f"Error clearing LLM cache: {str(e)}")
-            # Fallback: try to clear specific LLM keys
-            try:
-                # This is a simple approach - clear all cache
-                cache.clear()
-                logger.info("LLM cache cleared via fallback method")
-            except Exception as e2:
-                logger.error(f"Failed to clear cache: {str(e2)}")
+            logger.error(f"Failed to clear LLM cache: {str(e)}")
+            return 0
     
     def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache statistics (if supported by backend)."""
         try:
             # This is a simple implementation - actual stats depend on cache backend
             return {
-                "backend": "Django Database Cache",
+                "backend": "Django Redis Cache",
                 "timeout": self.cache_timeout,
                 "status": "active"
             }
@@ -164,123 +291,122 @@ class LLMService:
             logger.warning(f"Error getting cache stats: {str(e)}")
             return {"status": "error", "error": str(e)}
     
-    def generate_summary(self, content: str, model: str = None) -> Optional[str]:
-        """Generate a summary of the article content."""
+    def _build_article_prompt(self, content: str) -> str:
+        """Build the combined summary and investment suggestion prompt for an article."""
+        # Truncate content properly
+        truncated_content = self._truncate_content(content, 2000)
+        
+        return ARTICLE_PROMPT_TEMPLATE.format(content=truncated_content)
+    
+    def generate_article_analysis(self, content: str, model: str = None) -> Optional[Dict[str, Any]]:
+        """Generate the summary and investment suggestion for an article in a single LLM call."""
         try:
             # Check cache first
-            cache_key = self._get_cache_key(content, "summary")
+            cache_key = self._get_cache_key(content, task_type="article")
             cached_result = self._get_from_cache(cache_key)
             if cached_result:
                 return cached_result
             
-            # Truncate content properly
-            truncated_content = self._truncate_content(content, 2000)
-            
-            prompt = f"""
-            Please provide a concise summary (2-3 sentences) of the following news article content. 
-            Focus on the key facts and main points that would be relevant for investment decisions.
+            prompt = self._build_article_prompt(content)
             
-            Content: {truncated_content}
-            """
-            
-            result = self._call_llm_api(prompt, "summary", model)
+            result = self._call_llm_api(prompt, "article_analysis", model)
             if result:
-                self._save_to_cache(cache_key, result)
-            return result
+                structured_result = self._parse_investment_suggestion(result)
+                self._save_to_cache(cache_key, structured_result)
+                return structured_result
+            return None
         
         except Exception as e:
-            logger.error(f"Error generating summary: {str(e)}")
+            logger.error(f"Error generating article analysis: {str(e)}")
             return None
     
-    def generate_investment_suggestion(self, content: str, summary: str, model: str = None) -> Optional[Dict[str, str]]:
-        """Generate investment suggestions based on article content."""
+    async def _generate_article_analysis_async(self, aclient: Optional[AsyncOpenAI], content: str, model: str = None) -> Optional[Dict[str, Any]]:
+        """Async version of generate_article_analysis, run on generate_batch's client."""
         try:
-            # Check cache first
-            cache_key = self._get_cache_key(f"{content}_{summary}", "investment_suggestion")
-            cached_result = self._get_from_cache(cache_key)
+            # Check cache first; the cache calls block, so keep them off the event loop
+            cache_key = self._get_cache_key(content, task_type="article")
+            cached_result = await sync_to_async(self._get_from_cache)(cache_key)
             if cached_result:
                 return cached_result
             
-            # Truncate content properly
-            truncated_content = self._truncate_content(content, 1500)
+            prompt = self._build_article_prompt(content)
             
-            prompt = f"""
-You are a financial analyst. Evaluate the short-term (1–7 days) impact of this news on publicly traded stocks or market indices only. Ignore startups, private firms, or long-term ecosystem effects.
-
-Scoring rules:
-- 0.0–0.1: Absolutely no short-term market impact
-- 0.2: Minimal/negligible impact
-- 0.3–0.4: Very minor impact, not worth investment action
-- 0.5: Neutral / uncertain impact
-- 0.6–0.8: Clear impact on a sector or public company
-- 0.9–1.0: Strong, highly certain impact on overall market or major stocks
-
-Examples:
-- "Fed unexpectedly raises interest rates" → 0.95
-- "Apple launches new color iPhone case" → 0.15
-- "Tesla recalls 2M vehicles due to safety issue" → 0.8
-- "Lebron James's VC firm invests in a private AI food startup" → 0.0
-
-News Summary: {summary}
-News Content: {truncated_content}
-
-Respond ONLY in valid JSON:
-{{
-  "key_impact": "[brief impact]",
-  "suggestion": "[investment recommendation]",
-  "confidence_score": <float between 0 and 1>
-}}
-"""
-
-            result = self._call_llm_api(prompt, "investment_suggestion", model)
+            result = await self._call_llm_api_async(aclient, prompt, "article_analysis", model)
             if result:
-                # Try to parse as structured JSON, fallback to string parsing
                 structured_result = self._parse_investment_suggestion(result)
-                self._save_to_cache(cache_key, structured_result)
+                await sync_to_async(self._save_to_cache)(cache_key, structured_result)
                 return structured_result
             return None
         
         except Exception as e:
-            logger.error(f"Error generating investment suggestion: {str(e)}")
+            logger.error(f"Error generating article analysis: {str(e)}")
             return None
     
+    async def generate_batch(self, contents: List[str], model: str = None, concurrency: int = 8) -> List[Optional[Dict[str, Any]]]:
+        """Analyze many articles concurrently, keeping at most `concurrency` requests in flight.
+
+        The async client is created per call: its connection pool belongs to the
+        running event loop, so it can't be shared across asyncio.run() calls.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def analyze(aclient: Optional[AsyncOpenAI], content: str) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await self._generate_article_analysis_async(aclient, content, model)
+        
+        if not self.api_key:
+            return await asyncio.gather(*(analyze(None, content) for content in contents))
+        async with AsyncOpenAI(api_key=self.api_key) as aclient:
+            return await asyncio.gather(*(analyze(aclient, content) for content in contents))
+    
+    def generate_summary(self, content: str, model: str = None) -> Optional[str]:
+        """Generate a summary of the article content (shares the article analysis call)."""
+        analysis = self.generate_article_analysis(content, model)
+        return analysis.get('summary') if analysis else None
+    
+    def generate_investment_suggestion(self, content: str, summary: str, model: str = None) -> Optional[Dict[str, str]]:
+        """Generate investment suggestions based on article content (shares the article analysis call).
+
+        The summary is produced in the same call, so the summary argument is not needed anymore
+        and is kept only for backwards compatibility.
+        """
+        analysis = self.generate_article_analysis(content, model)
+        if not analysis:
+            return None
+        return {
+            'key_impact': analysis.get('key_impact', ''),
+            'suggestion': analysis.get('suggestion', ''),
+            'confidence_score': analysis.get('confidence_score')
+        }
+    
     def _parse_investment_suggestion(self, response: str) -> Dict[str, Any]:
         """Parse investment suggestion response into structured format."""
-        try:
-            # Try to parse as JSON first
-            parsed = json.loads(response)
-            # Ensure confidence_score is a float if present
-            if 'confidence_score' in parsed:
-                try:
-                    parsed['confidence_score'] = float(parsed['confidence_score'])
-                except (ValueError, TypeError):
-                    parsed['confidence_score'] = None
-            return parsed
-        except json.JSONDecodeError:
-            # Fallback to text parsing
-            lines = response.strip().split('\n')
-            result = {"key_impact": "", "suggestion": "", "confidence_score": None}
-            
-            for line in lines:
-                line = line.strip()
-                if line.startswith('"key_impact"') or line.startswith('Key Impact'):
-                    result["key_impact"] = line.split(':', 1)[1].strip().strip('"')
-                elif line.startswith('"suggestion"') or line.startswith('Investment Suggestion'):
-                    result["suggestion"] = line.split(':', 1)[1].strip().strip('"')
-                elif line.startswith('"confidence_score"') or line.startswith('Confidence Score'):
-                    try:
-                        confidence_str = line.split(':', 1)[1].strip().strip('"')
-                        result["confidence_score"] = float(confidence_str)
-                    except (ValueError, TypeError):
-                        result["confidence_score"] = None
-            
-            # If parsing failed, return the raw response in both fields
-            if not result["key_impact"] and not result["suggestion"]:
-                result["key_impact"] = "Analysis completed"
-                result["suggestion"] = response
-                result["confidence_score"] = None
-            
-            return result
+        # Responses are constrained by a JSON schema, so they always parse
+        return orjson.loads(response)
+    
+    def _build_request(self, prompt: str, task_type: str, model: str = None) -> Dict[str, Any]:
+        """Build the responses API arguments for a prompt."""
+        text_options = {"verbosity": "low"}
+        if task_type in RESPONSE_FORMATS:
+            text_options["format"] = RESPONSE_FORMATS[task_type]
+        
+        return {
+            "model": model or self.default_model,
+            "instructions": SYSTEM_MESSAGE,
+            "input": prompt,
+            "reasoning": {"effort": "medium"},
+            "text": text_options
+        }
+    
+    def _handle_response(self, response, model: str, task_type: str) -> str:
+        """Log the cost of a responses API call and return its output text."""
+        # The API reports exact billed token counts (including reasoning tokens)
+        cost_info = self._calculate_cost(response.usage.input_tokens, response.usage.output_tokens, model)
+        
+        # Log the cost
+        self._log_cost(cost_info, task_type)
+        
+        return response.output_text.strip()
     
     def _call_llm_api(self, prompt: str, task_type: str, model: str = None) -> Optional[str]:
         """Make API call to LLM service using OpenAI SDK."""
@@ -289,51 +415,38 @@ Respond ONLY in valid JSON:
             return self._get_placeholder_response(task_type)
         
         try:
-            # Prepare the full input with system message
-            system_message = 'You are a financial analyst providing investment insights based on news articles.'
-            full_input = f"{system_message}\n\n{prompt}"
-            
-            # Count input tokens
-            input_tokens = self._count_tokens(full_input)
-            
-            # Use provided model or default
-            selected_model = model or self.default_model
-            
-            # Call OpenAI responses API
-            response = self.client.responses.create(
-                model=selected_model,
-                input=full_input,
-                reasoning={"effort": "medium"},
-                text={"verbosity": "low"}
-            )
-            
-            # Extract the output text
-            response_content = response.output_text.strip()
-            
-            # Count output tokens and calculate cost
-            output_tokens = self._count_tokens(response_content)
-            cost_info = self._calculate_cost(input_tokens, output_tokens, selected_model)
-            
-            # Log the cost
-            self._log_cost(cost_info, task_type)
-            
-            return response_content
+            request = self._build_request(prompt, task_type, model)
+            response = self.client.responses.create(**request)
+            return self._handle_response(response, request["model"], task_type)
         
         except Exception as e:
             logger.error(f"Error calling LLM API: {str(e)}")
             return self._get_placeholder_response(task_type)
     
+    async def _call_llm_api_async(self, aclient: Optional[AsyncOpenAI], prompt: str, task_type: str, model: str = None) -> Optional[str]:
+        """Make API call to LLM service using the given async OpenAI SDK client."""
+        if not aclient:
+            logger.warning("No API key provided, using placeholder response")
+            return self._get_placeholder_response(task_type)
+        
+        try:
+            request = self._build_request(prompt, task_type, model)
+            response = await aclient.responses.create(**request)
+            return self._handle_response(response, request["model"], task_type)
+        
+        except Exception as e:
+            logger.error(f"Error calling LLM API: {str(e)}")
+            return self._get_placeholder_response(task_type)
     
     def _get_placeholder_response(self, task_type: str) -> str:
         """Generate placeholder response when API is not available."""
-        if task_type == "summary":
-            return "This article discusses recent developments in the technology sector that may have implications for investors and market participants."
-        elif task_type == "investment_suggestion":
-            return json.dumps({
+        if task_type == "article_analysis":
+            return orjson.dumps({
+                "summary": "This article discusses recent developments in the technology sector that may have implications for investors and market participants.",
                 "key_impact": "Technology sector developments may influence market sentiment",
                 "suggestion": "Monitor related stocks and consider sector-specific ETFs for potential opportunities",
                 "confidence_score": 0.5
-            })
+            }).decode()
         else:
             return "Analysis pending - please check back later for updated insights."
     
@@ -341,15 +454,9 @@ Respond ONLY in valid JSON:
         """Set the default LLM model to use."""
         if model in self.pricing:
             self.default_model = model
-            try:
-                self.tokenizer = tiktoken.encoding_for_model(model)
-                logger.info(f"Set default model to: {model}")
-                return True
-            except Exception as e:
-                logger.warning(f"Could not initialize tokenizer for {model}: {e}")
-                # Fallback to cl100k_base encoding
-                self.tokenizer = tiktoken.get_encoding("cl100k_base")
-                return True
+            self.tokenizer = _get_encoding(model)
+            logger.info(f"Set default model to: {model}")
+            return True
         else:
             logger.error(f"Unknown model: {model}. Available models: {list(self.pricing.keys())}")
             return False
@@ -369,11 +476,18 @@ Respond ONLY in valid JSON:
             logger.warning(f"Unknown model: {model}")
             return {}
     
-    def estimate_cost(self, input_text: str, expected_output_length: int = 200, model: str = None) -> Dict[str, float]:
-        """Estimate the cost of processing the given input text."""
-        input_tokens = self._count_tokens(input_text)
-        # Rough estimation for output tokens based on expected length
-        output_tokens = self._count_tokens("x" * expected_output_length)
+    def estimate_cost(self, input_text: Union[str, List[str]], expected_output_length: int = 200, model: str = None) -> Dict[str, float]:
+        """Estimate the cost of processing the given input text (or list of texts)."""
+        texts = [input_text] if isinstance(input_text, str) else list(input_text)
+        # Only tokenize the first ESTIMATE_SAMPLE_CHARS of each text and scale by length;
+        # exact counts come from the API usage for billed calls
+        samples = [text[:ESTIMATE_SAMPLE_CHARS] for text in texts]
+        input_tokens = sum(
+            int(sample_tokens * len(text) / max(len(sample), 1))
+            for text, sample, sample_tokens in zip(texts, samples, self._count_tokens_batch(samples))
+        )
+        # Rough estimation for output tokens based on expected length per input (1 token ≈ 4 characters)
+        output_tokens = (expected_output_length // 4) * len(texts)
         
         return self._calculate_cost(input_tokens, output_tokens, model)
     
@@ -400,8 +514,6 @@ if __name__ == "__main__":
     # test prompt for confidence score 
     print("Testing with fresh LLM responses...")
 
-    summary = "OpenAI signs a multi-billion dollar chips deal with AMD"
-
     content = """
     OpenAI has struck a sweeping deal with chipmaker AMD to secure processors for artificial intelligence systems, an agreement that could give the ChatGPT maker a 10% stake in AMD and further speeds up its trillion-dollar infrastructure push.
 
@@ -420,5 +532,5 @@ AMD has been investing heavily in recent years in the market for so-called accel
 AMD's chief financial officer Jean Hu added that the deal is “expected to deliver tens of billions of dollars in revenue” for the company.
     """
 
-    result = llm_service.generate_investment_suggestion(content, summary, model="gpt-5-mini")
+    result = llm_service.generate_article_analysis(content, model="gpt-5-mini")
     print(result)
\ No newline at end of file
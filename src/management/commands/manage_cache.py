@@ -14,7 +14,15 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         action = options['action']
-        llm_service = LLMService()
+
+        if action == 'setup':
+            # Kept so existing scripts don't break; the cache now lives in Redis
+            self.stdout.write(
+                self.style.SUCCESS('✅ The Redis cache needs no setup (no cache table is used)')
+            )
+            return
+
+        llm_service = LLMService.instance()
 
         if action == 'clear':
             self.stdout.write('Clearing LLM cache...')
@@ -30,15 +38,3 @@ class Command(BaseCommand):
             self.stdout.write(f"Timeout: {stats.get('timeout', 'Unknown')} seconds")
             self.stdout.write(f"Status: {stats.get('status', 'Unknown')}")
 
-        elif action == 'setup':
-            self.stdout.write('Setting up cache table...')
-            from django.core.management import execute_from_command_line
-            try:
-                execute_from_command_line(['manage.py', 'createcachetable'])
-                self.stdout.write(
-                    self.style.SUCCESS('✅ Cache table created successfully!')
-                )
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'❌ Error creating cache table: {e}')
-                )
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from src.models import Article
+from src.scrapers import hash_url
+
+
+class Command(BaseCommand):
+    help = 'Recompute hashed_url for stored articles (needed after changing the URL hash)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of articles updated per query'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write('Recomputing URL hashes...')
+
+        updated = 0
+        batch = []
+        for article in Article.objects.only('id', 'url', 'hashed_url').iterator(chunk_size=batch_size):
+            url_hash = hash_url(article.url)
+            if article.hashed_url != url_hash:
+                article.hashed_url = url_hash
+                batch.append(article)
+            if len(batch) >= batch_size:
+                Article.objects.bulk_update(batch, ['hashed_url'])
+                updated += len(batch)
+                batch = []
+
+        if batch:
+            Article.objects.bulk_update(batch, ['hashed_url'])
+            updated += len(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Updated {updated} article hashes')
+        )
@@ -13,7 +13,7 @@ class Article(models.Model):
     id = models.AutoField(primary_key=True)
     title = models.CharField(max_length=255)
     url = models.URLField(max_length=500, unique=True)
-    hashed_url = models.CharField(max_length=64, unique=True, help_text="SHA-256 hash of the URL for duplicate detection")
+    hashed_url = models.CharField(max_length=32, unique=True, help_text="BLAKE2b-128 hash of the URL for duplicate detection")
     content = models.TextField()
     published_at = models.DateTimeField()
     summary = models.TextField(null=True, blank=True)
@@ -26,11 +26,14 @@ class Article(models.Model):
     class Meta:
         db_table = 'news_article'
         ordering = ['-published_at']
+        # url and hashed_url are already indexed by their unique constraints, and
+        # source-only lookups use the leading column of the composite index
         indexes = [
-            models.Index(fields=['source']),
             models.Index(fields=['published_at']),
-            models.Index(fields=['url']),
-            models.Index(fields=['hashed_url']),
+            # Admin/list filtering by source in the default ordering
+            models.Index(fields=['source', '-published_at']),
+            # cleanup_old_articles_task range scan
+            models.Index(fields=['created_at']),
         ]
     
     def __str__(self):
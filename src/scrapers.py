@@ -1,25 +1,126 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from selectolax.lexbor import LexborHTMLParser
 from newspaper import Article as NewsArticle
 from datetime import datetime, timedelta
 import logging
-import time
 import re
-from typing import List, Dict, Optional
-from urllib.parse import urljoin, urlparse
+import hashlib
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Iterator, Tuple
+from urllib.parse import urljoin, urlparse, urlunparse
 
 logger = logging.getLogger('news')
 
+# Article pages fetched (and parsed) concurrently per source (also the session pool size)
+MAX_CONCURRENT_FETCHES = 8
+
+# Only articles published within this window are scraped
+ARTICLE_MAX_AGE = timedelta(hours=24)
+
+# TechCrunch listing links under these paths aren't news articles
+_TC_SKIP_RE = re.compile(r'/(?:video|events|podcast|newsletters|author)/')
+
+# Listing-page link selectors
+_TC_LINK_SELECTOR = "ul.wp-block-post-template li.wp-block-post a.loop-card__title-link"
+_REUTERS_LINK_SELECTOR = 'a[data-testid="Heading"][href]'
+
+
+class TokenBucket:
+    """Thread-safe token bucket: allows bursts up to capacity, then `rate` requests per second."""
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def wait(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+# One bucket per host, shared by every scraper hitting that host
+_HOST_BUCKETS: Dict[str, TokenBucket] = {}
+_HOST_BUCKETS_LOCK = threading.Lock()
+
+
+# scheme, netloc, path, ?query, #fragment. URLs urlparse/urlunparse treat specially
+# (';params' in the path, an empty netloc, IPv6 brackets, tabs/newlines, leading
+# whitespace) don't match and take the urlparse branch, so the result is the same
+_URL_RE = re.compile(r'([A-Za-z][A-Za-z0-9+.-]*)://([^/?#\[\]\t\r\n]+)((?:/[^?#;\t\r\n]*)?)(\?[^#\t\r\n]*)?(#[^\t\r\n]*)?')
+
+
+# Pure function; URLs are hashed both when filtering stored links and when saving articles
+@functools.lru_cache(maxsize=4096)
+def hash_url(url: str) -> str:
+    """Generate a 16-byte BLAKE2b hash of the URL for duplicate detection."""
+    # Normalize URL to handle variations: lowercase scheme and netloc, remove trailing slash
+    match = _URL_RE.fullmatch(url)
+    if match:
+        scheme, netloc, path, query, fragment = match.groups()
+        # Drop a bare '?' or '#' the same way urlunparse would
+        query = '' if query in (None, '?') else query
+        fragment = '' if fragment in (None, '#') else fragment
+        normalized_url = f"{scheme.lower()}://{netloc.lower()}{path.rstrip('/') or '/'}{query}{fragment}"
+    else:
+        parsed = urlparse(url)
+        normalized_url = urlunparse((
+            parsed.scheme.lower(),
+            parsed.netloc.lower(),
+            parsed.path.rstrip('/') or '/',
+            parsed.params,
+            parsed.query,
+            parsed.fragment
+        ))
+    
+    return hashlib.blake2b(normalized_url.encode('utf-8'), digest_size=16).hexdigest()
+
 
 class BaseScraper:
     """Base class for news scrapers."""
     
+    # Per-host request budget for article fetches (429s are also backed off by the Retry adapter,
+    # which honours Retry-After)
+    requests_per_second = 4.0
+    burst = MAX_CONCURRENT_FETCHES
+    
     def __init__(self, source: str, base_url: str):
         self.source = source
         self.base_url = base_url
-        self.session = requests.Session()
+        self.session = self._build_session()
         self._setup_headers()
     
+    def _build_session(self) -> requests.Session:
+        """Create an HTTP session with keep-alive pooling and retry/backoff on transient errors."""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=MAX_CONCURRENT_FETCHES,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+            )
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
     def _setup_headers(self):
         """Setup headers based on the source."""
         if self.source.lower() == 'reuters':
@@ -48,33 +149,61 @@ class BaseScraper:
         except Exception as e:
             logger.warning(f"Failed to establish session with {self.source}: {str(e)}")
     
-    def get_article_links(self) -> List[str]:
-        """Get list of article URLs from the source."""
+    def _rate_limiter(self, url: str) -> TokenBucket:
+        """Get the shared token bucket for the URL's host."""
+        host = urlparse(url).netloc.lower()
+        with _HOST_BUCKETS_LOCK:
+            bucket = _HOST_BUCKETS.get(host)
+            if bucket is None:
+                bucket = _HOST_BUCKETS[host] = TokenBucket(self.requests_per_second, self.burst)
+            return bucket
+    
+    def _decode_html(self, response: requests.Response) -> str:
+        """Decode an HTML response, assuming UTF-8 when the server doesn't declare a charset."""
+        # Without a declared charset requests falls back to ISO-8859-1 for text/html
+        # (or runs charset detection over the whole body for other types)
+        if 'charset' not in response.headers.get('Content-Type', '').lower():
+            response.encoding = 'utf-8'
+        return response.text
+    
+    def get_article_links(self) -> List[Tuple[str, Optional[datetime]]]:
+        """Get list of (article URL, listing publish time or None) pairs from the source."""
         raise NotImplementedError
     
+    def _listing_time(self, node, card_tag: str = 'li') -> Optional[datetime]:
+        """Read the <time datetime="..."> of the listing card containing node, as naive local time."""
+        card = node.parent
+        while card is not None and card.tag != card_tag:
+            card = card.parent
+        time_node = card.css_first('time[datetime]') if card is not None else None
+        if time_node is None:
+            return None
+        
+        try:
+            published = datetime.fromisoformat(time_node.attributes['datetime'])
+        except ValueError:
+            return None
+        # Compare in naive local time like scrape_article does
+        return published.astimezone().replace(tzinfo=None) if published.tzinfo else published
+    
     def scrape_article(self, url: str) -> Optional[Dict]:
         """Scrape individual article content."""
         try:
+            # Fetch through our pooled session (instead of newspaper3k's own downloader)
+            # so connections and headers are reused for every article
+            headers = {'Referer': self.base_url}
             if self.source.lower() == 'reuters':
-                # Reuters needs custom session handling due to anti-bot protection
-                headers = {
-                    'Referer': self.base_url,
-                    'Sec-Fetch-Site': 'same-origin'
-                }
-                
-                # Download content using our session with proper headers
-                response = self.session.get(url, timeout=10, headers=headers)
-                response.raise_for_status()
-                
-                # Use newspaper3k for content extraction with downloaded HTML
-                article = NewsArticle(url)
-                article.set_html(response.text)
-                article.parse()
-            else:
-                # TechCrunch and other sources work fine with newspaper3k's default downloader
-                article = NewsArticle(url)
-                article.download()
-                article.parse()
+                # Reuters anti-bot protection expects same-origin navigation
+                headers['Sec-Fetch-Site'] = 'same-origin'
+            
+            self._rate_limiter(url).wait()
+            response = self.session.get(url, timeout=10, headers=headers)
+            response.raise_for_status()
+            
+            # Use newspaper3k for content extraction with downloaded HTML
+            article = NewsArticle(url)
+            article.set_html(self._decode_html(response))
+            article.parse()
             
             if not article.title or not article.text:
                 logger.warning(f"Failed to extract content from {url}")
@@ -91,7 +220,7 @@ class BaseScraper:
                 current_time = current_time.replace(tzinfo=None)
             
             # Check if article is within last 24 hours
-            if publish_date < current_time - timedelta(hours=24):
+            if publish_date < current_time - ARTICLE_MAX_AGE:
                 logger.info(f"Article too old (>{publish_date}), skipping: {url}")
                 return None
             
@@ -114,32 +243,74 @@ class BaseScraper:
         
         logger.info(f"Found {len(links)} articles from {self.source}")
         
-        for i, link in enumerate(links):
-            try:
-                article_data = self.scrape_article(link)
-                
-                if article_data:
-                    # Safely encode title for logging
-                    title = article_data['title'][:50] + '...' if len(article_data['title']) > 50 else article_data['title']
-                    # Use safe encoding for logging
-                    safe_title = title.encode('utf-8', 'replace').decode('utf-8')
-                    logger.info(f"Scraped {i+1}/{len(links)} article: {safe_title}")
-                    articles.append(article_data)
-                else:
-                    # If article_data is None, it means the article was too old
-                    # Since articles are in chronological order, stop here
-                    logger.info(f"Stopping scraping at article {i+1} - article too old (24h limit reached)")
-                    break
-                
-                # Rate limiting
-                time.sleep(1)
-            
-            except Exception as e:
-                logger.error(f"Error processing article {link}: {str(e)}")
-                continue
+        links = self._drop_stale(links)
+        links = self._drop_seen(links)
+        
+        for i, article_data in enumerate(self._scrape_links(links)):
+            if article_data:
+                # Safely encode title for logging
+                title = article_data['title'][:50] + '...' if len(article_data['title']) > 50 else article_data['title']
+                # Use safe encoding for logging
+                safe_title = title.encode('utf-8', 'replace').decode('utf-8')
+                logger.info(f"Scraped {i+1}/{len(links)} article: {safe_title}")
+                articles.append(article_data)
+            else:
+                # If article_data is None, it means the article was too old
+                # Since articles are in chronological order, stop here
+                logger.info(f"Stopping scraping at article {i+1} - article too old (24h limit reached)")
+                break
         
         logger.info(f"Successfully scraped {len(articles)} articles from {self.source}")
         return articles
+    
+    def _drop_stale(self, links: List[Tuple[str, Optional[datetime]]]) -> List[str]:
+        """Cut the listing at the first link whose listing date is past ARTICLE_MAX_AGE.
+
+        Listings are chronological, so nothing after it needs to be downloaded. Links
+        without a listing date are kept and checked after download instead.
+        """
+        cutoff = datetime.now() - ARTICLE_MAX_AGE
+        fresh = []
+        for link, published in links:
+            if published is not None and published < cutoff:
+                logger.info(f"Stopping at listing entry {len(fresh)+1} - listed {published}, older than 24h: {link}")
+                break
+            fresh.append(link)
+        return fresh
+    
+    def _drop_seen(self, links: List[str]) -> List[str]:
+        """Drop links whose articles are already stored, so they aren't downloaded again."""
+        try:
+            from .models import Article
+            
+            hashes = [hash_url(link) for link in links]
+            known = set(Article.objects.filter(hashed_url__in=hashes).values_list('hashed_url', flat=True))
+        except Exception as e:
+            logger.warning(f"Could not check {self.source} links against stored articles: {str(e)}")
+            return links
+        
+        if known:
+            logger.info(f"Skipping {len(known)} already stored articles from {self.source}")
+        return [link for link, url_hash in zip(links, hashes) if url_hash not in known]
+    
+    def _scrape_links(self, links: List[str]) -> Iterator[Optional[Dict]]:
+        """Yield scraped articles in listing order, fetching MAX_CONCURRENT_FETCHES at a time.
+
+        Windows are only started as the caller consumes results, so stopping at the
+        first too-old article also stops further fetches.
+        """
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FETCHES) as executor:
+            for start in range(0, len(links), MAX_CONCURRENT_FETCHES):
+                window = links[start:start + MAX_CONCURRENT_FETCHES]
+                yield from executor.map(self._scrape_link, window)
+    
+    def _scrape_link(self, link: str) -> Optional[Dict]:
+        """Scrape one article, logging instead of raising on errors."""
+        try:
+            return self.scrape_article(link)
+        except Exception as e:
+            logger.error(f"Error processing article {link}: {str(e)}")
+            return None
 
 
 class TechCrunchScraper(BaseScraper):
@@ -150,22 +321,24 @@ class TechCrunchScraper(BaseScraper):
         self.tech_url = 'https://techcrunch.com/latest/'
     
 
-    def get_article_links(self) -> List[str]:
-        """Get TechCrunch article links (Latest News)."""
+    def get_article_links(self) -> List[Tuple[str, Optional[datetime]]]:
+        """Get TechCrunch article links (Latest News) with their listing publish times."""
         try:
             # TechCrunch doesn't need session establishment
             response = self.session.get(self.tech_url, timeout=10)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, "html.parser")
+            # Hand Lexbor the raw bytes; it decodes them itself, so requests never builds a str copy
+            tree = LexborHTMLParser(response.content)
 
             links = []
+            seen = set()
             # Select all article <a> tags inside wp-block-post list
-            for a in soup.select("ul.wp-block-post-template li.wp-block-post a.loop-card__title-link"):
-                href = a.get("href")
-                if href and href.startswith("https://techcrunch.com/"):
-                    if not any(x in href for x in ["/video/", "/events/", "/podcast/", "/newsletters/", "/author/"]):
-                        if href not in links:
-                            links.append(href)
+            for a in tree.css(_TC_LINK_SELECTOR):
+                href = a.attributes.get("href")
+                if href and href.startswith("https://techcrunch.com/") and href not in seen:
+                    if not _TC_SKIP_RE.search(href):
+                        seen.add(href)
+                        links.append((href, self._listing_time(a)))
 
             return links
 
@@ -178,6 +351,10 @@ class TechCrunchScraper(BaseScraper):
 class ReutersMarketScraper(BaseScraper):
     """Scraper for Reuters Markets sections (e.g., US, Stocks)."""
     
+    # Reuters is quick to flag bursts of requests as bots
+    requests_per_second = 1.0
+    burst = 2
+    
     def __init__(self, section: str):
         """
         section: 'us' or 'stocks'
@@ -186,23 +363,26 @@ class ReutersMarketScraper(BaseScraper):
         self.section = section
         self.url = f"https://www.reuters.com/markets/{section}/"
     
-    def get_article_links(self) -> List[str]:
-        """Get Reuters article links from the section page."""
+    def get_article_links(self) -> List[Tuple[str, Optional[datetime]]]:
+        """Get Reuters article links from the section page with their listing publish times."""
         try:
             self.establish_session()
             response = self.session.get(self.url, timeout=10)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Hand Lexbor the raw bytes; it decodes them itself, so requests never builds a str copy
+            tree = LexborHTMLParser(response.content)
             links = []
+            seen = set()
             
             # Select <a> tags with data-testid="Heading"
-            for a in soup.find_all("a", attrs={"data-testid": "Heading"}, href=True):
-                href = a["href"]
+            for a in tree.css(_REUTERS_LINK_SELECTOR):
+                href = a.attributes["href"]
                 # Full URL
                 full_url = urljoin(self.base_url, href)
-                if full_url not in links:
-                    links.append(full_url)
+                if full_url not in seen:
+                    seen.add(full_url)
+                    links.append((full_url, self._listing_time(a)))
             
             return links
         except Exception as e:
@@ -226,19 +406,34 @@ class ScrapingService:
         
         logger.info(f"Starting scraping from {len(self.scrapers)} source(s): {[s.source for s in self.scrapers]}")
         
-        for i, scraper in enumerate(self.scrapers, 1):
-            try:
-                logger.info(f"[{i}/{len(self.scrapers)}] Starting scraping from {scraper.source}")
-                articles = scraper.scrape_all()
+        # Each source is a different host with its own session, so scrape them in parallel;
+        # results are still collected in scraper order
+        with ThreadPoolExecutor(max_workers=max(len(self.scrapers), 1)) as executor:
+            for articles in executor.map(self._scrape_source, range(1, len(self.scrapers) + 1), self.scrapers):
                 all_articles.extend(articles)
-                logger.info(f"[{i}/{len(self.scrapers)}] Completed scraping from {scraper.source}: {len(articles)} articles")
-            
-            except Exception as e:
-                logger.error(f"[{i}/{len(self.scrapers)}] Error scraping from {scraper.source}: {str(e)}")
-                continue
         
         logger.info(f"Total articles scraped from TechCrunch: {len(all_articles)}")
         return all_articles
+    
+    def _scrape_source(self, i: int, scraper: BaseScraper) -> List[Dict]:
+        """Scrape one source on a worker thread, logging instead of raising on errors."""
+        try:
+            logger.info(f"[{i}/{len(self.scrapers)}] Starting scraping from {scraper.source}")
+            articles = scraper.scrape_all()
+            logger.info(f"[{i}/{len(self.scrapers)}] Completed scraping from {scraper.source}: {len(articles)} articles")
+            return articles
+        
+        except Exception as e:
+            logger.error(f"[{i}/{len(self.scrapers)}] Error scraping from {scraper.source}: {str(e)}")
+            return []
+        
+        finally:
+            # Database connections are per thread; close the one the stored-link check opened
+            try:
+                from django.db import connections
+                connections.close_all()
+            except Exception:
+                pass
 
 
 if __name__ == "__main__":
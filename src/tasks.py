@@ -1,68 +1,154 @@
-from celery import shared_task
+from celery import shared_task, chord
+from celery.signals import worker_process_init
+from celery.utils.time import get_exponential_backoff_interval
+from django.core.cache import cache
 from django.utils import timezone
 from datetime import timedelta
 import logging
-import hashlib
+import random
+import uuid
+from redis.exceptions import LockError
 from .models import Article
-from .scrapers import ScrapingService
+from .scrapers import ScrapingService, hash_url
 from .llm_service import LLMService
-from .email_service import EmailNotificationService
+from .email_service import get_service as get_email_service, AlertSendError
 
 logger = logging.getLogger('news')
 
+# Prevents overlapping scrape runs when one takes longer than the beat interval.
+# The lock is released as soon as the task finishes; the timeout only matters
+# if a worker dies mid-run, and is jittered so replicas don't expire in lockstep.
+# Release only deletes the key if it still holds this run's token, so a run that
+# outlived its lock can't drop the lock another run has since taken.
+SCRAPE_LOCK_KEY = 'scrape:lock'
+SCRAPE_LOCK_TIMEOUT = 600  # 10 minutes in seconds
+SCRAPE_LOCK_JITTER = 20  # seconds
 
-def hash_url(url: str) -> str:
-    """Generate SHA-256 hash of the URL for duplicate detection."""
-    from urllib.parse import urlparse, urlunparse
+CLEANUP_CHUNK_SIZE = 2000
+
+# Article API responses are cached under a version number that is bumped whenever
+# articles are added, updated or deleted, so every cached page goes stale at once
+ARTICLES_CACHE_VERSION_KEY = 'articles:version'
+ARTICLES_CACHE_TIMEOUT = 300  # 5 minutes in seconds
+# Processed articles trickle in one task at a time, so their version bumps are
+# coalesced: the first save schedules one bump this many seconds later
+ARTICLES_CACHE_INVALIDATE_DELAY = 10  # seconds
+ARTICLES_CACHE_PENDING_KEY = 'articles:invalidate:pending'
+
+# Rows per INSERT when storing scraped articles; article bodies are large, so keep
+# each statement well under MySQL's max_allowed_packet
+ARTICLE_INSERT_BATCH_SIZE = 100
+
+
+class CacheLock:
+    """Token lock on the plain cache API, for cache backends without a Redis client.
+
+    Release checks the token and deletes in two steps, which is only safe for the
+    single-process caches (locmem, tests) this is used with.
+    """
+    
+    def __init__(self, key: str, timeout: int):
+        self.key = key
+        self.timeout = timeout
+        self.token = uuid.uuid4().hex
     
-    # Normalize URL to handle variations
-    parsed = urlparse(url)
-    # Remove trailing slash, normalize scheme and netloc
-    normalized_url = urlunparse((
-        parsed.scheme.lower(),
-        parsed.netloc.lower(),
-        parsed.path.rstrip('/') or '/',
-        parsed.params,
-        parsed.query,
-        parsed.fragment
-    ))
+    def acquire(self) -> bool:
+        return cache.add(self.key, self.token, timeout=self.timeout)
     
-    return hashlib.sha256(normalized_url.encode('utf-8')).hexdigest()
+    def release(self):
+        if cache.get(self.key) != self.token:
+            raise LockError("Cannot release a lock that's no longer owned")
+        cache.delete(self.key)
 
 
-@shared_task
+def get_scrape_lock(timeout: int):
+    """Non-blocking Redis lock on the cache server, keyed like a regular cache entry."""
+    get_client = getattr(getattr(cache, '_cache', None), 'get_client', None)
+    if get_client is None:
+        return CacheLock(SCRAPE_LOCK_KEY, timeout)
+    key = cache.make_and_validate_key(SCRAPE_LOCK_KEY)
+    return get_client(key, write=True).lock(key, timeout=timeout, blocking=False)
+
+
+def get_articles_cache_version() -> int:
+    """Current version for cached article API responses."""
+    return cache.get_or_set(ARTICLES_CACHE_VERSION_KEY, 1, timeout=None)
+
+
+def invalidate_articles_cache():
+    """Make all cached article API responses stale."""
+    try:
+        cache.incr(ARTICLES_CACHE_VERSION_KEY)
+    except ValueError:
+        # No version stored yet, so nothing has been cached under one
+        pass
+
+
+def schedule_articles_cache_invalidation():
+    """Make cached article API responses stale shortly, once per burst of updates."""
+    if cache.add(ARTICLES_CACHE_PENDING_KEY, 1, timeout=ARTICLES_CACHE_INVALIDATE_DELAY):
+        invalidate_articles_cache_task.apply_async(countdown=ARTICLES_CACHE_INVALIDATE_DELAY)
+
+
+@shared_task(ignore_result=True)
+def invalidate_articles_cache_task():
+    """Celery task to bump the articles cache version scheduled by schedule_articles_cache_invalidation."""
+    # Clear the marker first so updates saved after this bump schedule another one
+    cache.delete(ARTICLES_CACHE_PENDING_KEY)
+    invalidate_articles_cache()
+
+
+@shared_task(ignore_result=True)
 def scrape_articles_task():
     """Celery task to scrape articles from all sources."""
     logger.info("=== CELERY TASK STARTED ===")
     logger.info("Starting article scraping task")
     
+    lock_timeout = SCRAPE_LOCK_TIMEOUT + random.randint(-SCRAPE_LOCK_JITTER, SCRAPE_LOCK_JITTER)
+    try:
+        scrape_lock = get_scrape_lock(lock_timeout)
+        acquired = scrape_lock.acquire()
+    except Exception as e:
+        logger.error(f"Could not take the scrape lock: {str(e)}")
+        logger.error("=== CELERY TASK FAILED ===")
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+    
+    if not acquired:
+        logger.info("Previous scraping task is still running, skipping this run")
+        return {
+            'status': 'skipped',
+            'reason': 'previous scraping task still running'
+        }
+    
     try:
         # Initialize services
-        logger.info("Initializing scraping and LLM services...")
+        logger.info("Initializing scraping service...")
         scraping_service = ScrapingService()
-        llm_service = LLMService()
         
         # Scrape articles from all sources
         logger.info("Starting to scrape articles from all sources...")
         scraped_articles = scraping_service.scrape_all_sources()
         logger.info(f"Found {len(scraped_articles)} articles to process haha")
         
-        # Check how many already exist in database
-        existing_count = 0
+        # Look up which articles already exist with a single query. Each URL is
+        # hashed once here and the hash is reused when building the rows below
         for article_data in scraped_articles:
-            url_hash = hash_url(article_data['url'])
-            logger.info(f"Checking if article already exists: {article_data['url']}")
-            logger.info(f"Checking if article hashed url already exists: {url_hash}")
-            if Article.objects.filter(hashed_url=url_hash).exists():
-                logger.info(f"Article with hashed url = {url_hash} already exists")
-                existing_count += 1
+            article_data['hashed_url'] = hash_url(article_data['url'])
+        existing_hashes = set(
+            Article.objects.filter(hashed_url__in=[a['hashed_url'] for a in scraped_articles])
+            .values_list('hashed_url', flat=True)
+        )
+        existing_count = len(existing_hashes)
         
         logger.info(f"Articles found: {len(scraped_articles)}, Already in database: {existing_count}, New articles: {len(scraped_articles) - existing_count}")
         
-        new_articles_count = 0
+        new_articles = []
         new_article_ids = []
         
-        # First pass: Create all new articles
+        # First pass: Collect all new articles
         for i, article_data in enumerate(scraped_articles, 1):
             try:
                 # Safely encode title for logging
@@ -70,33 +156,42 @@ def scrape_articles_task():
                 safe_title = title.encode('utf-8', 'replace').decode('utf-8')
                 logger.info(f"Processing article {i}/{len(scraped_articles)}: {safe_title}")
                 
-                # Generate hash for the URL
-                url_hash = hash_url(article_data['url'])
+                url_hash = article_data['hashed_url']
                 logger.debug(f"Generated URL hash: {url_hash[:8]}... for URL: {article_data['url']}")
                 
-                # Check if article already exists using both URL and hashed URL
-                if Article.objects.filter(hashed_url=url_hash).exists() or Article.objects.filter(url=article_data['url']).exists():
+                # The hash identifies the (normalized) URL; any url conflict left over is
+                # absorbed by bulk_create's ignore_conflicts
+                if url_hash in existing_hashes:
                     logger.info(f"Article already exists, skipping...")
                     continue
+                existing_hashes.add(url_hash)
                 
-                # Create new article
-                article = Article.objects.create(
+                new_articles.append(Article(
                     title=article_data['title'],
                     url=article_data['url'],
                     hashed_url=url_hash,
                     content=article_data['content'],
                     published_at=article_data['published_at'],
                     source=article_data['source']
-                )
-                
-                new_articles_count += 1
-                new_article_ids.append(article.id)
-                logger.info(f"Created new article: {article.title[:50]}... (Source: {article.source})")
+                ))
+                logger.info(f"New article: {safe_title} (Source: {article_data['source']})")
                 
             except Exception as e:
                 logger.error(f"Error processing article {article_data.get('url', 'unknown')}: {str(e)}")
                 continue
         
+        # Insert all new articles in batched INSERTs. MySQL doesn't return primary
+        # keys from bulk_create, so look the IDs up by hash afterwards
+        if new_articles:
+            Article.objects.bulk_create(new_articles, batch_size=ARTICLE_INSERT_BATCH_SIZE, ignore_conflicts=True)
+            new_article_ids = list(
+                Article.objects.filter(hashed_url__in=[a.hashed_url for a in new_articles])
+                .order_by('id')
+                .values_list('id', flat=True)
+            )
+            invalidate_articles_cache()
+        new_articles_count = len(new_article_ids)
+        
         # Second pass: Batch queue all new articles for LLM processing
         if new_article_ids:
             logger.info(f"Batch queuing {len(new_article_ids)} articles for async LLM processing")
@@ -119,27 +214,36 @@ def scrape_articles_task():
             'status': 'error',
             'error': str(e)
         }
+    
+    finally:
+        try:
+            scrape_lock.release()
+        except LockError:
+            logger.warning("Scrape lock expired before the task finished; it was not released")
+        except Exception as e:
+            # The lock still expires on its own
+            logger.error(f"Could not release the scrape lock: {str(e)}")
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def batch_process_articles_task(article_ids):
     """Celery task to process multiple articles with LLM in parallel."""
     logger.info(f"Starting batch processing task for {len(article_ids)} articles")
     
     try:
         # Queue individual processing tasks for each article
-        # This allows Celery to process them in parallel across multiple workers
-        task_ids = []
-        for article_id in article_ids:
-            task = process_article_task.delay(article_id)
-            task_ids.append(task.id)
-            logger.info(f"Queued LLM processing for article {article_id} with task ID {task.id}")
+        # This allows Celery to process them in parallel across multiple workers;
+        # once all of them finish, high-confidence alerts go out in a single batch
+        result = chord(
+            process_article_task.s(article_id) for article_id in article_ids
+        )(send_high_confidence_alerts_task.s())
         
-        logger.info(f"Batch processing task completed. Queued {len(task_ids)} individual processing tasks")
+        logger.info(f"Batch processing task completed. Queued {len(article_ids)} individual processing tasks (group {result.parent.id})")
         return {
             'status': 'success',
             'articles_count': len(article_ids),
-            'task_ids': task_ids
+            'group_id': result.parent.id,
+            'callback_id': result.id
         }
     
     except Exception as e:
@@ -150,6 +254,13 @@ def batch_process_articles_task(article_ids):
         }
 
 
+@worker_process_init.connect
+def init_llm_service(**kwargs):
+    """Create the shared LLMService when a prefork child starts (other pools create it on first use)."""
+    LLMService.instance()
+
+
+# Results are stored (unlike the other tasks) because they feed the alert chord callback
 @shared_task
 def process_article_task(article_id):
     """Celery task to process a single article with LLM."""
@@ -157,72 +268,45 @@ def process_article_task(article_id):
     
     try:
         article = Article.objects.get(id=article_id)
-        llm_service = LLMService()
+        # Shared per worker process so the OpenAI client's connections are reused
+        llm_service = LLMService.instance()
         
         # Get model from environment variable or use default
         import os
         model = os.getenv('LLM_MODEL', 'gpt-5-mini')
         
-        try:
-            # Generate summary
-            logger.info(f"Generating summary for article {article_id} using model: {model}")
-            summary = llm_service.generate_summary(article.content, model=model)
-            
-            if summary:
-                article.summary = summary
-                logger.info(f"Generated summary for article {article_id}")
-            
-            # Generate investment suggestion
-            logger.info(f"Generating investment suggestion for article {article_id} using model: {model}")
-            logger.info("=== DEBUG: About to log article content ===")
-            logger.info(f"Article Content Length: {len(article.content) if article.content else 0}")
-            logger.info(f"Article Content (first 200 chars): {article.content[:200] if article.content else 'None'}...")
-            logger.info("=== DEBUG: About to log summary ===")
-            logger.info(f"Summary Length: {len(summary) if summary else 0}")
-            logger.info(f"Summary (first 100 chars): {summary[:100] if summary else 'None'}...")
-            logger.info("=== DEBUG: Finished logging content and summary ===")
-            suggestion_data = llm_service.generate_investment_suggestion(article.content, summary or "", model=model)
-            
-            if suggestion_data:
-                # Handle both old string format and new structured format
-                if isinstance(suggestion_data, dict):
-                    # New structured format
-                    article.suggestion = f"Key Impact: {suggestion_data.get('key_impact', '')}\nInvestment Suggestion: {suggestion_data.get('suggestion', '')}"
-                    # Store confidence score if available
-                    if 'confidence_score' in suggestion_data and suggestion_data['confidence_score'] is not None:
-                        article.confidence_score = suggestion_data['confidence_score']
-                        logger.info(f"Set confidence score {article.confidence_score} for article {article_id}")
-                else:
-                    # Old string format (fallback)
-                    article.suggestion = suggestion_data
-                logger.info(f"Generated investment suggestion for article {article_id}")
-            
-            # Save the article
-            article.save()
-            
-            # Send email notification for high confidence scores
-            try:
-                email_service = EmailNotificationService()
-                if email_service.send_high_confidence_alert(article):
-                    logger.info(f"High-confidence email alert sent for article {article_id} (confidence: {article.confidence_score})")
-                else:
-                    logger.debug(f"No email alert sent for article {article_id} (confidence: {article.confidence_score})")
-            except Exception as e:
-                logger.error(f"Error sending email alert for article {article_id}: {str(e)}")
-            
-            logger.info(f"Article processing completed for article {article_id}")
-            return {
-                'status': 'success',
-                'article_id': article_id,
-                'summary_generated': bool(summary),
-                'suggestion_generated': bool(suggestion_data),
-                'confidence_score': article.confidence_score,
-                'email_sent': email_service.should_send_notification(article.confidence_score) if 'email_service' in locals() else False
-            }
+        # Generate summary and investment suggestion in a single LLM call
+        logger.info(f"Generating analysis for article {article_id} using model: {model}")
+        logger.info(f"Article Content Length: {len(article.content) if article.content else 0}")
+        analysis = llm_service.generate_article_analysis(article.content, model=model)
+        
+        summary = analysis.get('summary') if analysis else None
+        suggestion_data = analysis if analysis and (analysis.get('key_impact') or analysis.get('suggestion')) else None
+        
+        if summary:
+            article.summary = summary
+            logger.info(f"Generated summary for article {article_id}")
+        
+        if suggestion_data:
+            article.suggestion = f"Key Impact: {suggestion_data.get('key_impact', '')}\nInvestment Suggestion: {suggestion_data.get('suggestion', '')}"
+            # Store confidence score if available
+            if suggestion_data.get('confidence_score') is not None:
+                article.confidence_score = suggestion_data['confidence_score']
+                logger.info(f"Set confidence score {article.confidence_score} for article {article_id}")
+            logger.info(f"Generated investment suggestion for article {article_id}")
         
-        finally:
-            # Always close the session to free up resources
-            llm_service.close_session()
+        # Save only the fields the LLM produced
+        article.save(update_fields=['summary', 'suggestion', 'confidence_score', 'updated_at'])
+        schedule_articles_cache_invalidation()
+        
+        logger.info(f"Article processing completed for article {article_id}")
+        return {
+            'status': 'success',
+            'article_id': article_id,
+            'summary_generated': bool(summary),
+            'suggestion_generated': bool(suggestion_data),
+            'confidence_score': article.confidence_score
+        }
     
     except Article.DoesNotExist:
         logger.error(f"Article {article_id} not found")
@@ -239,7 +323,41 @@ def process_article_task(article_id):
         }
 
 
-@shared_task
+@shared_task(bind=True, ignore_result=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=3)
+def send_high_confidence_alerts_task(self, results, article_ids=None):
+    """Celery task to send email alerts for a batch of processed articles.
+
+    Routed to the dedicated 'email' queue so SendGrid latency never holds up
+    scraping or LLM processing workers. When only some SendGrid requests fail,
+    the retry is given just the articles whose alerts are still unsent.
+    """
+    if article_ids is None:
+        article_ids = [r['article_id'] for r in results if r.get('status') == 'success']
+    logger.info(f"Starting email alert task for {len(article_ids)} processed articles")
+    
+    try:
+        articles = list(Article.objects.filter(id__in=article_ids))
+        sent_count = get_email_service().send_high_confidence_alerts_batch(articles)
+    except AlertSendError as e:
+        logger.error(f"Email alert task failed (attempt {self.request.retries + 1}): {str(e)}; {e.sent_count} alerts were sent")
+        raise self.retry(
+            kwargs={'article_ids': e.unsent_ids},
+            exc=e,
+            countdown=get_exponential_backoff_interval(factor=1, retries=self.request.retries, maximum=600)
+        )
+    except Exception as e:
+        logger.error(f"Email alert task failed (attempt {self.request.retries + 1}): {str(e)}")
+        raise
+    
+    logger.info(f"Email alert task completed. Alerts sent for {sent_count} articles")
+    return {
+        'status': 'success',
+        'articles_count': len(articles),
+        'alerts_sent': sent_count
+    }
+
+
+@shared_task(ignore_result=True)
 def cleanup_old_articles_task():
     """Celery task to clean up old articles (older than 30 days)."""
     logger.info("Starting cleanup task for old articles")
@@ -248,8 +366,17 @@ def cleanup_old_articles_task():
         cutoff_date = timezone.now() - timedelta(days=30)
         old_articles = Article.objects.filter(created_at__lt=cutoff_date)
         
-        count = old_articles.count()
-        old_articles.delete()
+        # Delete by primary key in chunks so no single DELETE holds locks for long
+        count = 0
+        while True:
+            ids = list(old_articles.order_by().values_list('id', flat=True)[:CLEANUP_CHUNK_SIZE])
+            if not ids:
+                break
+            deleted, _ = Article.objects.filter(id__in=ids).delete()
+            count += deleted
+        
+        if count:
+            invalidate_articles_cache()
         
         logger.info(f"Cleanup task completed. Deleted {count} old articles")
         return {
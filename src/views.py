@@ -2,17 +2,33 @@ from rest_framework import generics, status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from django.core.cache import cache
 from .models import Article
 from .serializers import ArticleSerializer, ArticleListSerializer
-from .tasks import scrape_articles_task
-from .email_service import EmailNotificationService
+from .tasks import scrape_articles_task, get_articles_cache_version, ARTICLES_CACHE_TIMEOUT
+from .email_service import get_service as get_email_service
 
 
 class ArticleListView(generics.ListAPIView):
     """List all articles with pagination."""
     
-    queryset = Article.objects.all()
+    # Load only the fields ArticleListSerializer uses (not content)
+    queryset = Article.objects.only(
+        'id', 'title', 'published_at', 'summary', 'suggestion', 'confidence_score', 'source'
+    ).order_by('-published_at')
     serializer_class = ArticleListSerializer
+    
+    def list(self, request, *args, **kwargs):
+        """Serve each page from the cache until articles change."""
+        # The paginated payload embeds absolute next/previous links, so key on the
+        # full URL (scheme and host included), not just the path
+        cache_key = f"articles:list:{request.build_absolute_uri()}"
+        version = get_articles_cache_version()
+        data = cache.get(cache_key, version=version)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(cache_key, data, ARTICLES_CACHE_TIMEOUT, version=version)
+        return Response(data)
 
 
 class ArticleDetailView(generics.RetrieveAPIView):
@@ -52,17 +68,15 @@ def trigger_scraping(request):
 def get_result(request):
     """Get all articles with title, url, summary, and suggestion."""
     try:
-        articles = Article.objects.all()
-        
-        result = []
-        for article in articles:
-            result.append({
-                'title': article.title,
-                'url': article.url,
-                'summary': article.summary,
-                'suggestion': article.suggestion,
-                'confidence_score': article.confidence_score
-            })
+        version = get_articles_cache_version()
+        result = cache.get('articles:result', version=version)
+        if result is None:
+            # Select only the returned columns (skips the large content field) as plain dicts
+            result = list(
+                Article.objects.order_by('-published_at')
+                .values('title', 'url', 'summary', 'suggestion', 'confidence_score')
+            )
+            cache.set('articles:result', result, ARTICLES_CACHE_TIMEOUT, version=version)
         
         return Response({
             'data': result,
@@ -88,7 +102,7 @@ def health_check(request):
 def test_email_config(request):
     """Test email configuration by sending a test email."""
     try:
-        email_service = EmailNotificationService()
+        email_service = get_email_service()
         
         # Get configuration status
         config_status = email_service.get_configuration_status()
@@ -125,7 +139,7 @@ def test_email_config(request):
 def email_config_status(request):
     """Get email configuration status."""
     try:
-        email_service = EmailNotificationService()
+        email_service = get_email_service()
         config_status = email_service.get_configuration_status()
         
         return Response({